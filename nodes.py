@@ -1,3 +1,4 @@
+import functools
 import logging
 import math
 from enum import Enum
@@ -18,6 +19,16 @@ class ConstraintMode(str, Enum):
     MAX_RES_STRICT = "Prioritize Max Resolution (Strict)"
 
 
+# Integer ids for ConstraintMode, used by the cached dimension core so it
+# compares ints instead of the long display strings
+_MODE_MIN_RES = 0
+_MODE_MAX_RES_STRICT = 1
+_MODE_IDS = {
+    ConstraintMode.MIN_RES.value: _MODE_MIN_RES,
+    ConstraintMode.MAX_RES_STRICT.value: _MODE_MAX_RES_STRICT,
+}
+
+
 class CropPosition(str, Enum):
     """Position for cropping when aspect ratios don't match"""
     CENTER = "center"
@@ -27,6 +38,17 @@ class CropPosition(str, Enum):
     RIGHT = "right"
 
 
+# Crop offset for each CropPosition, in halves of the excess width/height:
+# 0 keeps the left/top edge, 1 centers, 2 keeps the right/bottom edge
+_CROP_OFFSETS = {
+    CropPosition.CENTER.value: (1, 1),
+    CropPosition.TOP.value: (1, 0),
+    CropPosition.BOTTOM.value: (1, 2),
+    CropPosition.LEFT.value: (0, 1),
+    CropPosition.RIGHT.value: (2, 1),
+}
+
+
 class ResizeMethod(str, Enum):
     """Interpolation method used for resizing"""
     BILINEAR = "bilinear"
@@ -36,6 +58,90 @@ class ResizeMethod(str, Enum):
     AREA = "area"
 
 
+def _aspect_ratio(width: int, height: int) -> float:
+    """Calculate aspect ratio from width and height (unrounded)"""
+    if height == 0:
+        return 0.0
+    return width / height
+
+
+def _round_to_multiple(value: int, multiple: int) -> int:
+    """Round a value to the nearest multiple of the specified number"""
+    if multiple == 1:
+        # Never collapse a dimension to 0 (extreme aspect ratios in strict mode)
+        return max(1, value)
+    # Integer round-half-to-even: same result as round(value / multiple)
+    # without the float division
+    quotient, remainder = divmod(value, multiple)
+    if remainder * 2 > multiple or (remainder * 2 == multiple and quotient % 2):
+        quotient += 1
+    return max(multiple, multiple * quotient)
+
+
+# Pure function of a few small ints; re-running a workflow
+# with unchanged settings hits the cache instead of redoing the math.
+@functools.lru_cache(maxsize=256)
+def _optimal_dimensions(
+    width: int,
+    height: int,
+    min_res: int,
+    max_res: int,
+    multiple_of: int,
+    mode_id: int
+) -> Tuple[int, int]:
+    """Calculate optimal dimensions based on constraints (module-level core of the node method)"""
+    if height == 0 or width == 0:
+        return 0, 0
+
+    # 1. Initial scaling to fit the longest side to max_res. Integer math
+    #    (floor of max_res * short / long) avoids float round-off.
+    if width >= height:  # Landscape or square
+        new_width = max_res
+        new_height = max_res * height // width
+    else:  # Portrait
+        new_height = max_res
+        new_width = max_res * width // height
+
+    # 2. Apply constraint logic based on user's choice
+    if mode_id == _MODE_MIN_RES:
+        # If the short side is below min_res, scale the entire image up so it
+        # lands on min_res. Compared on the exact ratio, before flooring.
+        if max_res * min(width, height) < min_res * max(width, height):
+            if width >= height:
+                new_width = min_res * width // height
+                new_height = min_res
+            else:
+                new_width = min_res
+                new_height = min_res * height // width
+
+    # If mode is "Prioritize Max Resolution (Strict)", we do nothing here.
+    # The initial scaling keeps us within max_res before rounding, but rounding
+    # can push a dimension above max_res — the clamp below handles that.
+
+    # 3. Round final dimensions to the nearest multiple
+    final_width = _round_to_multiple(new_width, multiple_of)
+    final_height = _round_to_multiple(new_height, multiple_of)
+
+    # Nearest-multiple rounding can drop a dimension back below min_res
+    # (e.g. min_res=1100, multiple_of=256 -> 1024). In min-res mode, bump
+    # such a dimension up to the next multiple so the guarantee holds.
+    if mode_id == _MODE_MIN_RES:
+        min_allowed = ((min_res + multiple_of - 1) // multiple_of) * multiple_of
+        if final_width < min_res:
+            final_width = min_allowed
+        if final_height < min_res:
+            final_height = min_allowed
+
+    # 4. In strict mode, rounding can exceed max_res (e.g. round_to_multiple(2160, 32) = 2176).
+    #    Clamp to the largest valid multiple of multiple_of that is <= max_res.
+    if mode_id == _MODE_MAX_RES_STRICT:
+        max_allowed = (max_res // multiple_of) * multiple_of
+        final_width = min(final_width, max_allowed)
+        final_height = min(final_height, max_allowed)
+
+    return final_width, final_height
+
+
 class ConstrainResolution(io.ComfyNode):
     """
     A ComfyUI node that analyzes and resizes images to optimal dimensions
@@ -190,17 +296,13 @@ class ConstrainResolution(io.ComfyNode):
 
     @staticmethod
     def calculate_aspect_ratio(width: int, height: int) -> float:
-        """Calculate aspect ratio from width and height"""
-        if height == 0:
-            return 0.0
-        return round(width / height, 4)
+        """Calculate aspect ratio from width and height (unrounded)"""
+        return _aspect_ratio(width, height)
 
     @staticmethod
     def round_to_multiple(value: int, multiple: int) -> int:
         """Round a value to the nearest multiple of the specified number"""
-        if multiple == 1:
-            return value
-        return max(multiple, multiple * round(value / multiple))
+        return _round_to_multiple(value, multiple)
 
     @staticmethod
     def calculate_optimal_dimensions(
@@ -212,56 +314,9 @@ class ConstrainResolution(io.ComfyNode):
         constraint_mode: str
     ) -> Tuple[int, int]:
         """Calculate optimal dimensions based on constraints"""
-        if height == 0 or width == 0:
-            return 0, 0
-
-        aspect_ratio = width / height
-
-        # 1. Initial scaling to fit the longest side to max_res
-        if aspect_ratio >= 1:  # Landscape or square
-            new_width = max_res
-            new_height = new_width / aspect_ratio
-        else:  # Portrait
-            new_height = max_res
-            new_width = new_height * aspect_ratio
-
-        # 2. Apply constraint logic based on user's choice
-        if constraint_mode == ConstraintMode.MIN_RES.value:
-            # If a dimension is below min_res, scale the entire image up to meet it
-            scale_factor = 1.0
-            if new_width < min_res:
-                scale_factor = max(scale_factor, min_res / new_width)
-            if new_height < min_res:
-                scale_factor = max(scale_factor, min_res / new_height)
-
-            new_width *= scale_factor
-            new_height *= scale_factor
-
-        # If mode is "Prioritize Max Resolution (Strict)", we do nothing here.
-        # The initial scaling keeps us within max_res before rounding, but rounding
-        # can push a dimension above max_res — the clamp below handles that.
-
-        # 3. Round final dimensions to the nearest multiple
-        final_width = ConstrainResolution.round_to_multiple(int(new_width), multiple_of)
-        final_height = ConstrainResolution.round_to_multiple(int(new_height), multiple_of)
-
-        # Nearest-multiple rounding can drop a dimension back below min_res
-        # (e.g. min_res=1100, multiple_of=256 -> 1024). In min-res mode, bump
-        # such a dimension up to the next multiple so the guarantee holds.
-        if constraint_mode == ConstraintMode.MIN_RES.value:
-            if final_width < min_res:
-                final_width = math.ceil(min_res / multiple_of) * multiple_of
-            if final_height < min_res:
-                final_height = math.ceil(min_res / multiple_of) * multiple_of
-
-        # 4. In strict mode, rounding can exceed max_res (e.g. round_to_multiple(2160, 32) = 2176).
-        #    Clamp to the largest valid multiple of multiple_of that is <= max_res.
-        if constraint_mode == ConstraintMode.MAX_RES_STRICT.value:
-            max_allowed = (max_res // multiple_of) * multiple_of
-            final_width = min(final_width, max_allowed)
-            final_height = min(final_height, max_allowed)
-
-        return final_width, final_height
+        return _optimal_dimensions(
+            width, height, min_res, max_res, multiple_of, _MODE_IDS.get(constraint_mode, -1)
+        )
 
     @staticmethod
     def resize_image(
@@ -280,10 +335,16 @@ class ConstrainResolution(io.ComfyNode):
             method: Interpolation method (see ResizeMethod)
 
         Returns:
-            Resized tensor in same format as input
+            Resized tensor in same format as input, possibly a non-contiguous
+            view (the input itself if it already has the target dimensions)
         """
+        # Already at the target size: skip the interpolation pass entirely
+        if image.shape[1] == target_height and image.shape[2] == target_width:
+            return image
+
         # ComfyUI images are [batch, height, width, channels];
-        # resizing needs [batch, channels, height, width]
+        # resizing needs [batch, channels, height, width]. permute() only
+        # swaps strides, so neither permute copies the pixel data.
         image_permuted = image.permute(0, 3, 1, 2)
 
         try:
@@ -337,38 +398,17 @@ class ConstrainResolution(io.ComfyNode):
         if width_diff == 0 and height_diff == 0:
             return image
 
-        # Calculate crop coordinates based on position
-        if position == CropPosition.CENTER.value:
-            left = width_diff // 2
-            top = height_diff // 2
-        elif position == CropPosition.TOP.value:
-            left = width_diff // 2
-            top = 0
-        elif position == CropPosition.BOTTOM.value:
-            left = width_diff // 2
-            top = height_diff
-        elif position == CropPosition.LEFT.value:
-            left = 0
-            top = height_diff // 2
-        elif position == CropPosition.RIGHT.value:
-            left = width_diff
-            top = height_diff // 2
-        else:
-            # Default to center
-            left = width_diff // 2
-            top = height_diff // 2
+        # Calculate crop coordinates based on position (default to center)
+        x_halves, y_halves = _CROP_OFFSETS.get(position, (1, 1))
+        left = width_diff * x_halves // 2
+        top = height_diff * y_halves // 2
 
         # Ensure we don't go out of bounds
         left = max(0, min(left, width_diff))
         top = max(0, min(top, height_diff))
 
-        # Crop the image
-        right = left + target_width
-        bottom = top + target_height
-
-        cropped = image[:, top:bottom, left:right, :]
-
-        return cropped
+        # Crop the image (narrow returns a view, no data is copied)
+        return image.narrow(1, top, target_height).narrow(2, left, target_width)
 
     @classmethod
     def execute(
@@ -382,68 +422,73 @@ class ConstrainResolution(io.ComfyNode):
         crop_as_required,
         crop_position
     ) -> io.NodeOutput:
-        """Execute the node logic"""
+        """
+        Execute the node logic.
+
+        When the image already has the target dimensions it is returned as-is,
+        so resized_image and original_image are then the same tensor object.
+        """
         # Get original dimensions
         batch, height, width, channels = image.shape
 
-        original_aspect_ratio = cls.calculate_aspect_ratio(width, height)
+        original_aspect_ratio = _aspect_ratio(width, height)
 
         # Calculate optimal dimensions
-        target_width, target_height = cls.calculate_optimal_dimensions(
-            width, height, min_res, max_res, multiple_of, constraint_mode
+        target_width, target_height = _optimal_dimensions(
+            width, height, min_res, max_res, multiple_of, _MODE_IDS.get(constraint_mode, -1)
         )
 
-        # Resize image to target dimensions
-        resized_image = cls.resize_image(image, target_width, target_height, resize_method)
-
-        # Calculate aspect ratio after resize
-        final_aspect_ratio = cls.calculate_aspect_ratio(target_width, target_height)
-
-        # Check if cropping is needed and enabled
-        if crop_as_required and original_aspect_ratio > 0:
-            # Determine if we need to crop
-            # After rounding to multiples, the aspect ratio might have changed slightly
-            # We'll resize to maintain aspect ratio on the larger dimension, then crop
+        # Aspect ratio of the target dimensions
+        final_aspect_ratio = _aspect_ratio(target_width, target_height)
 
+        # After rounding to multiples, the aspect ratio might have changed slightly
+        aspect_ratio_deviation = 0.0
+        if original_aspect_ratio > 0:
             aspect_ratio_deviation = abs((final_aspect_ratio - original_aspect_ratio) / original_aspect_ratio * 100)
 
-            if aspect_ratio_deviation > 0.1:  # If more than 0.1% deviation
-                # Resize to preserve aspect ratio, making one dimension larger than target, then crop
-                # ceil + max keep the intermediate dimension at or above the target,
-                # so the crop below never has to grow the image
-                if width / height > target_width / target_height:
-                    # Original is wider (more landscape), resize based on height and crop width
-                    # This ensures height matches target, width will be larger and cropped
-                    intermediate_width = max(target_width, math.ceil(target_height * width / height))
-                    resized_image = cls.resize_image(image, intermediate_width, target_height, resize_method)
-                else:
-                    # Original is taller (more portrait), resize based on width and crop height
-                    # This ensures width matches target, height will be larger and cropped
-                    intermediate_height = max(target_height, math.ceil(target_width * height / width))
-                    resized_image = cls.resize_image(image, target_width, intermediate_height, resize_method)
-
-                # Crop to exact target dimensions
-                resized_image = cls.crop_image(resized_image, target_width, target_height, crop_position)
-
-                logger.debug("Image cropped to achieve exact dimensions %dx%d", target_width, target_height)
+        # Decide on cropping from the target dimensions alone, so the image is
+        # only ever resized once. We'll resize to maintain aspect ratio on the
+        # larger dimension, then crop
+        needs_crop = crop_as_required and aspect_ratio_deviation > 0.1  # If more than 0.1% deviation
+
+        if needs_crop:
+            # Resize to preserve aspect ratio, making one dimension larger than target, then crop
+            # ceil + max keep the intermediate dimension at or above the target,
+            # so the crop below never has to grow the image
+            if width / height > target_width / target_height:
+                # Original is wider (more landscape), resize based on height and crop width
+                # This ensures height matches target, width will be larger and cropped
+                intermediate_width = max(target_width, math.ceil(target_height * width / height))
+                resized_image = cls.resize_image(image, intermediate_width, target_height, resize_method)
+            else:
+                # Original is taller (more portrait), resize based on width and crop height
+                # This ensures width matches target, height will be larger and cropped
+                intermediate_height = max(target_height, math.ceil(target_width * height / width))
+                resized_image = cls.resize_image(image, target_width, intermediate_height, resize_method)
+
+            # Crop to exact target dimensions
+            resized_image = cls.crop_image(resized_image, target_width, target_height, crop_position)
+
+            logger.debug("Image cropped to achieve exact dimensions %dx%d", target_width, target_height)
+        else:
+            # Resize image to target dimensions
+            resized_image = cls.resize_image(image, target_width, target_height, resize_method)
 
         # Log aspect ratio deviation warning if significant
-        if original_aspect_ratio > 0 and not crop_as_required:
-            aspect_ratio_deviation = abs((final_aspect_ratio - original_aspect_ratio) / original_aspect_ratio * 100)
-            if aspect_ratio_deviation > 1:  # 1% tolerance for rounding
-                logger.info(
-                    "Aspect ratio changed by %.2f%% due to rounding. "
-                    "Enable 'Crop as Required' to preserve exact aspect ratio.",
-                    aspect_ratio_deviation
-                )
+        if not crop_as_required and aspect_ratio_deviation > 1:  # 1% tolerance for rounding
+            logger.info(
+                "Aspect ratio changed by %.2f%% due to rounding. "
+                "Enable 'Crop as Required' to preserve exact aspect ratio.",
+                aspect_ratio_deviation
+            )
 
         return io.NodeOutput(
-            resized_image,      # resized image
-            image,              # original image passthrough
-            target_width,       # final width
-            target_height,      # final height
-            final_aspect_ratio, # final aspect ratio
-            original_aspect_ratio  # original aspect ratio
+            resized_image,                   # resized image
+            image,                           # original image passthrough
+            target_width,                    # final width
+            target_height,                   # final height
+            round(final_aspect_ratio, 4),    # final aspect ratio
+            round(original_aspect_ratio, 4)  # original aspect ratio
         )
 
 
@@ -2,7 +2,7 @@ import sys
 
 import pytest
 import torch
-from nodes import ConstrainResolution, ConstraintMode, ResizeMethod
+from nodes import ConstrainResolution, ConstraintMode, ResizeMethod, _optimal_dimensions
 
 STRICT = ConstraintMode.MAX_RES_STRICT.value
 MIN = ConstraintMode.MIN_RES.value
@@ -69,6 +69,15 @@ class TestMaxResStrict:
         assert w % 64 == 0
         assert h % 64 == 0
 
+    @pytest.mark.parametrize("multiple_of", [1, 8, 64])
+    def test_extreme_aspect_ratio_stays_bounded(self, multiple_of):
+        """A 10000:1 panorama must fit the box without collapsing the short side to 0."""
+        w, h = calc(10000, 1, 704, 1280, multiple_of, STRICT)
+        assert w <= 1280
+        assert h >= 1
+        assert w % multiple_of == 0
+        assert h % multiple_of == 0
+
     def test_zero_dimensions(self):
         """Zero-dimension input should return (0, 0) without error."""
         w, h = calc(0, 0, 704, 2160, 32, STRICT)
@@ -95,6 +104,11 @@ class TestMinRes:
         assert w % 256 == 0
         assert h % 256 == 0
 
+    def test_exact_scale_not_truncated_by_float_error(self):
+        """1592 * 3990 / 796 is exactly 7980; float math used to truncate it to 7979."""
+        w, h = calc(3990, 796, 1592, 3896, 1, MIN)
+        assert (w, h) == (7980, 1592)
+
     def test_min_res_normal_case(self):
         """In MIN_RES mode with no extreme ratio, both dims should stay within normal range."""
         w, h = calc(500, 333, 704, 2048, 32, MIN)
@@ -103,6 +117,14 @@ class TestMinRes:
         assert min(w, h) >= 704
 
 
+class TestCaching:
+    def test_repeated_call_hits_cache(self):
+        first = calc(1234, 567, 704, 1280, 16, MIN)
+        hits = _optimal_dimensions.cache_info().hits
+        assert calc(1234, 567, 704, 1280, 16, MIN) == first
+        assert _optimal_dimensions.cache_info().hits == hits + 1
+
+
 class TestRoundToMultiple:
     def test_exact_multiple(self):
         assert ConstrainResolution.round_to_multiple(2048, 32) == 2048
@@ -115,6 +137,16 @@ class TestRoundToMultiple:
         # 2160 / 32 = 67.5 → banker's rounding → 68 → 2176
         assert ConstrainResolution.round_to_multiple(2160, 32) == 2176
 
+    def test_half_rounds_down_to_even(self):
+        # 2128 / 32 = 66.5 → banker's rounding → 66 → 2112
+        assert ConstrainResolution.round_to_multiple(2128, 32) == 2112
+
+    def test_non_power_of_two_multiple(self):
+        # 15 / 10 = 1.5 → 2, 25 / 10 = 2.5 → 2 (half to even), 26 / 10 → 3
+        assert ConstrainResolution.round_to_multiple(15, 10) == 20
+        assert ConstrainResolution.round_to_multiple(25, 10) == 20
+        assert ConstrainResolution.round_to_multiple(26, 10) == 30
+
     def test_multiple_of_1_is_identity(self):
         assert ConstrainResolution.round_to_multiple(1999, 1) == 1999
 
@@ -153,6 +185,33 @@ class TestExecuteShapes:
         assert resized.shape == (1, out_h, out_w, 3)
         assert original.shape == image.shape
 
+    def test_aspect_ratio_outputs_rounded(self):
+        image = torch.rand(1, 333, 500, 3)
+        *_, final_ar, original_ar = run_node(image, multiple_of=32)
+        assert original_ar == round(500 / 333, 4)
+        assert final_ar == round(final_ar, 4)
+
+    @pytest.mark.parametrize("crop_as_required", [True, False])
+    def test_resizes_only_once(self, monkeypatch, crop_as_required):
+        calls = []
+        original_resize = ConstrainResolution.resize_image
+
+        def counting_resize(*args, **kwargs):
+            calls.append(args[1:3])
+            return original_resize(*args, **kwargs)
+
+        monkeypatch.setattr(ConstrainResolution, "resize_image", staticmethod(counting_resize))
+        image = torch.rand(1, 333, 500, 3)
+        run_node(image, multiple_of=32, crop_as_required=crop_as_required)
+        assert len(calls) == 1
+
+    @pytest.mark.parametrize("crop_as_required", [True, False])
+    def test_image_already_at_target_is_passed_through(self, crop_as_required):
+        image = torch.rand(1, 720, 1280, 3)
+        resized, original, out_w, out_h, _, _ = run_node(image, crop_as_required=crop_as_required)
+        assert (out_w, out_h) == (1280, 720)
+        assert resized is image
+
     def test_no_crop_shape_still_matches(self):
         image = torch.rand(1, 333, 500, 3)
         resized, _, out_w, out_h, _, _ = run_node(image, crop_as_required=False, multiple_of=32)
@@ -166,6 +225,10 @@ class TestResizeMethods:
         out = ConstrainResolution.resize_image(image, 300, 200, method)
         assert out.shape == (2, 200, 300, 3)
 
+    def test_same_size_returns_input(self):
+        image = torch.rand(1, 64, 96, 3)
+        assert ConstrainResolution.resize_image(image, 96, 64, "lanczos") is image
+
     @pytest.mark.parametrize("method", ["bicubic", "lanczos"])
     def test_overshoot_is_clamped(self, method):
         image = torch.rand(1, 64, 64, 3)
@@ -180,3 +243,11 @@ class TestCropImage:
         image = torch.rand(1, 120, 200, 3)
         out = ConstrainResolution.crop_image(image, 100, 100, position)
         assert out.shape == (1, 100, 100, 3)
+
+    @pytest.mark.parametrize("position, top, left", [
+        ("center", 10, 50), ("top", 0, 50), ("bottom", 20, 50), ("left", 10, 0), ("right", 10, 100),
+    ])
+    def test_crop_positions_select_expected_region(self, position, top, left):
+        image = torch.rand(1, 120, 200, 3)
+        out = ConstrainResolution.crop_image(image, 100, 100, position)
+        assert torch.equal(out, image[:, top:top + 100, left:left + 100, :])